@@ -0,0 +1,2273 @@
+"""
+网页文章获取与转换核心模块（不依赖图形界面）
+供图形界面版 article_fetcher_gui.py 与命令行版 fetch_article.py 共用：
+1. HTTP会话（连接复用、重试、压缩）
+2. 文章获取与正文提取（微信公众号、Notion博客、通用网页）
+3. 图片下载
+4. EPUB转换
+"""
+
+import threading
+from collections import Counter
+import re
+import json
+import codecs
+import string
+import http.client
+import urllib.request
+import urllib.error
+import urllib.parse
+from datetime import datetime
+from html import unescape
+from pathlib import Path
+import os
+import time
+import hashlib
+import functools
+import io
+import uuid
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+try:
+    import mistune  # 可选依赖：更快的Markdown解析器
+except ImportError:
+    mistune = None
+
+try:
+    from lxml import etree, html as lxml_html  # 可选依赖：C实现的HTML解析器，定位正文区域
+except ImportError:
+    lxml_html = None
+
+
+# Markdown -> HTML：块级与行内语法合并为一个正则，单遍扫描后按命中分组分派
+_MD_TOKEN_RE = re.compile(
+    r'(?P<codeblock>```\w*\n(?P<codeblock_text>(?s:.*?))```)'
+    r'|(?P<heading>^(?P<heading_level>#{1,6})\s+(?P<heading_text>.+)$)'
+    r'|(?P<quote>^>\s*(?P<quote_text>.+)$)'
+    r'|(?P<hr>^---$)'
+    r'|(?P<li>^-\s+(?P<li_text>.+)$)'
+    r'|(?P<img>!\[(?P<img_alt>[^\]]*)\]\((?P<img_src>[^)]+)\))'
+    # 链接文字可内嵌图片（<a><img></a> 转出的 [![alt](src)](href)）
+    r'|(?P<link>\[(?P<link_text>(?:!\[[^\]]*\]\([^)]+\)|[^\]])+)\]\((?P<link_href>[^)]+)\))'
+    r'|(?P<code>`(?P<code_text>[^`]+)`)'
+    r'|(?P<bold>\*\*(?P<bold_text>[^*]+)\*\*)'
+    r'|(?P<em>\*(?P<em_text>[^*]+)\*)',
+    re.MULTILINE
+)
+# 仅行内语法，用于标题、引用、列表等内部文本
+_MD_INLINE_RE = re.compile(
+    r'(?P<img>!\[(?P<img_alt>[^\]]*)\]\((?P<img_src>[^)]+)\))'
+    r'|(?P<link>\[(?P<link_text>(?:!\[[^\]]*\]\([^)]+\)|[^\]])+)\]\((?P<link_href>[^)]+)\))'
+    r'|(?P<code>`(?P<code_text>[^`]+)`)'
+    r'|(?P<bold>\*\*(?P<bold_text>[^*]+)\*\*)'
+    r'|(?P<em>\*(?P<em_text>[^*]+)\*)'
+)
+_MD_LIST_RE = re.compile(r'(<li>.*</li>\n?)+')
+_MD_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+# 网页内容提取用的预编译正则
+_RE_META_OG_TITLE = re.compile(r'<meta[^>]*property="og:title"[^>]*content="([^"]*)"')
+_RE_META_TITLE = re.compile(r'<meta[^>]*name="title"[^>]*content="([^"]*)"')
+_RE_META_AUTHOR = re.compile(r'<meta[^>]*name="author"[^>]*content="([^"]*)"')
+_RE_H1 = re.compile(r'<h1[^>]*>(.*?)</h1>', re.DOTALL)
+_RE_TITLE_TAG = re.compile(r'<title>(.*?)</title>')
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_ARTICLE = re.compile(r'<article[^>]*>(.*?)</article>', re.DOTALL)
+_RE_MAIN = re.compile(r'<main[^>]*>(.*?)</main>', re.DOTALL)
+
+_RE_WECHAT_TITLE = re.compile(r'<h1[^>]*class="[^"]*rich_media_title[^"]*"[^>]*>(.*?)</h1>', re.DOTALL)
+_RE_WECHAT_TITLE_SUFFIX = re.compile(r'\s*[-_|]\s*微信公众号.*$')
+_RE_WECHAT_NICKNAME = re.compile(r'var\s+nickname\s*=\s*["\']([^"\']+)["\']')
+_RE_WECHAT_CONTENT = re.compile(r'<div[^>]*id="js_content"[^>]*>(.*?)</div>\s*(?:<div[^>]*class="[^"]*rich_media_tool|<script)', re.DOTALL)
+_RE_WECHAT_RICH_CONTENT = re.compile(r'<div[^>]*class="[^"]*rich_media_content[^"]*"[^>]*>(.*?)</div>', re.DOTALL)
+
+_RE_NOTION_TITLE_SUFFIX = re.compile(r'\s*[-_|]\s*Notion.*$', re.I)
+_RE_NOTION_AUTHOR_NAME = re.compile(r'"authorName"\s*:\s*"([^"]*)"')
+_RE_NOTION_BY_AUTHOR = re.compile(r'by\s+([A-Za-z\s]+)', re.I)
+_RE_NOTION_ARTICLE = re.compile(r'<article[^>]*class="[^"]*[^"]*"[^>]*>(.*?)</article>', re.DOTALL)
+_RE_NOTION_PAGE_CONTENT = re.compile(r'<div[^>]*class="[^"]*notion-page-content[^"]*"[^>]*>(.*?)</div>\s*(?:<footer|</main|<div[^>]*class="[^"]*footer)', re.DOTALL)
+
+# 通用网页提取使用的正则
+_RE_META_TWITTER_TITLE = re.compile(r'<meta[^>]*name="twitter:title"[^>]*content="([^"]*)"')
+_RE_META_ARTICLE_AUTHOR = re.compile(r'<meta[^>]*property="article:author"[^>]*content="([^"]*)"')
+_RE_SPAN_AUTHOR = re.compile(r'<span[^>]*class="[^"]*author[^"]*"[^>]*>(.*?)</span>', re.DOTALL)
+_RE_BODY = re.compile(r'<body[^>]*>(.*?)</body>', re.DOTALL)
+_RE_CONTENT_CLASSES = tuple(re.compile(p, re.DOTALL) for p in (
+    r'<div[^>]*class="[^"]*post-content[^"]*"[^>]*>(.*?)</div>',
+    r'<div[^>]*class="[^"]*article-content[^"]*"[^>]*>(.*?)</div>',
+    r'<div[^>]*class="[^"]*entry-content[^"]*"[^>]*>(.*?)</div>',
+    r'<div[^>]*class="[^"]*content[^"]*"[^>]*>(.*?)</div>',
+    r'<div[^>]*id="content"[^>]*>(.*?)</div>',
+    r'<div[^>]*id="article"[^>]*>(.*?)</div>',
+))
+
+# 图片URL提取使用的正则
+_RE_IMG_SRC = re.compile(r'<img[^>]*src=["\']([^"\']+)["\']', re.I)
+# 属性值中只解码这几个实体；html.unescape会把查询参数里的 &copy= 等误当作无分号实体
+_URL_ENTITIES = {'&amp;': '&', '&lt;': '<', '&gt;': '>', '&quot;': '"'}
+_RE_URL_ENTITY = re.compile('|'.join(_URL_ENTITIES))
+_RE_IMAGE_URL_EXT = re.compile(r'\.(jpg|jpeg|png|gif|webp|bmp|svg|avif)(\?|$)', re.I)
+
+# 清理Markdown时替换或删除的不可见字符
+_INVISIBLE_CHARS = str.maketrans({'\xa0': ' ', '\u200b': None, '\ufeff': None})
+
+# 文件名中不允许的字符，以及替换为下划线的空白
+_FILENAME_INVALID_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+_RE_WHITESPACE = re.compile(r'\s+')
+
+# HTML转Markdown使用的正则
+_RE_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_RE_IMG_TAG = re.compile(r'<img[^>]*>', re.I)
+_RE_IMG_TAG_SRC = re.compile(r'(?:data-src|src)="([^"]+)"')
+_RE_IMG_TAG_ALT = re.compile(r'alt="([^"]*)"')
+_RE_HEADING = re.compile(r'<h([1-6])[^>]*>(.*?)</h\1>', re.DOTALL)
+_RE_SECTION = re.compile(r'<section[^>]*>(.*?)</section>', re.DOTALL)
+_RE_P = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL)
+_RE_BR = re.compile(r'<br\s*/?>')
+_RE_STRONG = re.compile(r'<(strong|b)[^>]*>(.*?)</\1>', re.DOTALL)
+_RE_EM = re.compile(r'<(em|i)[^>]*>(.*?)</\1>', re.DOTALL)
+_RE_LINK = re.compile(r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', re.DOTALL)
+_RE_BLOCKQUOTE = re.compile(r'<blockquote[^>]*>(.*?)</blockquote>', re.DOTALL)
+_RE_UL = re.compile(r'<ul[^>]*>(.*?)</ul>', re.DOTALL)
+_RE_LI = re.compile(r'<li[^>]*>(.*?)</li>', re.DOTALL)
+_RE_OL = re.compile(r'<ol[^>]*>(.*?)</ol>', re.DOTALL)
+_RE_TABLE = re.compile(r'<table[^>]*>.*?</table>', re.DOTALL)
+_RE_TR = re.compile(r'<tr[^>]*>(.*?)</tr>', re.DOTALL)
+_RE_TD = re.compile(r'<t[dh][^>]*>(.*?)</t[dh]>', re.DOTALL)
+_RE_PRE_CODE = re.compile(r'<pre[^>]*><code[^>]*>(.*?)</code></pre>', re.DOTALL)
+_RE_PRE = re.compile(r'<pre[^>]*>(.*?)</pre>', re.DOTALL)
+_RE_CODE = re.compile(r'<code[^>]*>(.*?)</code>', re.DOTALL)
+_RE_HR = re.compile(r'<hr\s*/?>')
+_RE_SPAN = re.compile(r'<span[^>]*>(.*?)</span>', re.DOTALL)
+_RE_DIV = re.compile(r'<div[^>]*>(.*?)</div>', re.DOTALL)
+_RE_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _convert_image_to_png_worker(img_path):
+    """将图片转换为PNG字节（模块级函数，可在进程池中执行）"""
+    # 延迟导入PIL，仅在生成EPUB时才需要，加快界面启动
+    from PIL import Image
+
+    with Image.open(img_path) as img:
+        # 转换为RGB模式（如果需要）
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # 保持透明度
+            img = img.convert('RGBA')
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # 保存到内存中的PNG
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+
+# 仅转换ASCII字母的小写映射，保证转换后字符串长度不变，下标可与原文对应
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@functools.lru_cache(maxsize=None)
+def _strip_tags_pattern(tags):
+    """编译匹配任意一种开始标签的正则"""
+    return re.compile(r'<(' + '|'.join(tags) + r')\b', re.I)
+
+
+def _strip_tags(html, tags):
+    """单遍线性扫描移除多种 <tag ...>...</tag> 块（不区分大小写），未闭合的标签保持原样"""
+    pattern = _strip_tags_pattern(tags)
+    lower = None
+    unclosed = set()  # 之后不再出现结束标签的标签，不必重复查找
+    parts = []
+    pos = 0
+    search_from = 0
+    while True:
+        match = pattern.search(html, search_from)
+        if not match:
+            break
+        tag = match.group(1).translate(_ASCII_LOWER)
+        if tag in unclosed:
+            search_from = match.end()
+            continue
+        if lower is None:
+            lower = html.translate(_ASCII_LOWER)
+        close_tag = f'</{tag}>'
+        end = lower.find(close_tag, match.end())
+        if end < 0:
+            unclosed.add(tag)
+            search_from = match.end()
+            continue
+        parts.append(html[pos:match.start()])
+        pos = search_from = end + len(close_tag)
+    parts.append(html[pos:])
+    return ''.join(parts)
+
+
+# 已找到的Pandoc路径；未找到时不缓存，安装Pandoc或设置PANDOC后无需重启即可生效
+_pandoc_path = None
+
+
+def _find_pandoc_cached():
+    """查找Pandoc可执行文件路径（找到的路径在进程内缓存）"""
+    global _pandoc_path
+    if _pandoc_path is None:
+        _pandoc_path = _find_pandoc_uncached()
+    return _pandoc_path
+
+
+def _find_pandoc_uncached():
+    """在PANDOC环境变量、系统PATH和Windows常见安装位置中查找Pandoc"""
+    # 优先使用PANDOC环境变量指定的路径
+    pandoc = os.environ.get('PANDOC')
+    if pandoc and Path(pandoc).is_file():
+        return pandoc
+
+    # 其次尝试系统PATH
+    pandoc = shutil.which('pandoc')
+    if pandoc:
+        return pandoc
+
+    # 尝试Windows常见安装位置（其他平台不会存在这些路径）
+    if os.name != 'nt':
+        return None
+
+    common_paths = [
+        r'C:\Program Files\Pandoc\pandoc.exe',
+        r'C:\Program Files (x86)\Pandoc\pandoc.exe',
+        os.path.expanduser(r'~\AppData\Local\Pandoc\pandoc.exe'),
+    ]
+
+    for path in common_paths:
+        if Path(path).is_file():
+            return path
+
+    return None
+
+
+def _evict_cache(cache_dir, pattern, max_bytes):
+    """按修改时间淘汰最旧的缓存文件，使总大小不超过上限"""
+    entries = []
+    for path in cache_dir.glob(pattern):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+def _lxml_inner_html(html, xpaths, strip_tags):
+    """用lxml解析一次HTML，返回第一个命中容器移除非内容元素后的内部HTML；lxml不可用或未命中时返回None"""
+    if lxml_html is None:
+        return None
+    try:
+        tree = lxml_html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+    for xpath in xpaths:
+        nodes = tree.xpath(xpath)
+        if nodes:
+            node = nodes[0]
+            break
+    else:
+        return None
+
+    etree.strip_elements(node, *strip_tags, with_tail=False)
+    markup = lxml_html.tostring(node, encoding='unicode', with_tail=False)
+    # 去掉容器自身的开始和结束标签
+    inner = markup[markup.find('>') + 1:markup.rfind('</')]
+    return inner if inner.strip() else None
+
+
+@functools.lru_cache(maxsize=16)
+def _image_url_replacer(mapping_items):
+    """编译图片URL替换正则，返回 (正则, 替换表)；同一映射在多种格式间复用时不必重新编译"""
+    # 完整URL优先；下载失败的URL映射到自身，同样需要占位，避免其中的相对路径被替换
+    replacements = dict(mapping_items)
+
+    # Also try to replace relative URL version (for Notion proxy URLs)
+    for original_url, local_path in mapping_items:
+        parsed = urllib.parse.urlsplit(original_url)
+        if len(parsed.path) > 1 and parsed.path.startswith('/'):
+            relative_url = parsed.path
+            if parsed.query:
+                relative_url += '?' + parsed.query
+            replacements.setdefault(relative_url, local_path)
+
+    # 长的优先，避免较短的URL抢先匹配另一个URL的前缀
+    pattern = re.compile('|'.join(map(re.escape, sorted(replacements, key=len, reverse=True))))
+    return pattern, replacements
+
+
+def _unescape_url(url):
+    """单遍解码URL属性值中的 &amp; &lt; &gt; &quot; 实体"""
+    return _RE_URL_ENTITY.sub(lambda m: _URL_ENTITIES[m.group(0)], url)
+
+
+# 各正则的匹配结果必然包含的字面量；文本中不含该字面量时无需运行正则
+_REGEX_PRESCAN = {
+    _RE_META_OG_TITLE: 'og:title',
+    _RE_META_TITLE: 'name="title"',
+    _RE_META_TWITTER_TITLE: 'twitter:title',
+    _RE_META_AUTHOR: 'name="author"',
+    _RE_META_ARTICLE_AUTHOR: 'article:author',
+    _RE_SPAN_AUTHOR: 'author',
+    _RE_H1: '<h1',
+    _RE_TITLE_TAG: '<title>',
+    _RE_ARTICLE: '<article',
+    _RE_MAIN: '<main',
+    _RE_BODY: '<body',
+    _RE_WECHAT_TITLE: 'rich_media_title',
+    _RE_WECHAT_NICKNAME: 'nickname',
+    _RE_WECHAT_CONTENT: 'js_content',
+    _RE_WECHAT_RICH_CONTENT: 'rich_media_content',
+    _RE_NOTION_AUTHOR_NAME: '"authorName"',
+    _RE_NOTION_ARTICLE: '<article',
+    _RE_NOTION_PAGE_CONTENT: 'notion-page-content',
+}
+_REGEX_PRESCAN.update(zip(_RE_CONTENT_CLASSES, (
+    'post-content', 'article-content', 'entry-content', 'content', 'id="content"', 'id="article"',
+)))
+
+
+def _search(pattern, text):
+    """先用字面量子串预检（C实现，远快于正则扫描），命中后再执行正则搜索"""
+    needle = _REGEX_PRESCAN.get(pattern)
+    if needle is not None and needle not in text:
+        return None
+    return pattern.search(text)
+
+
+def _search_first(patterns, text):
+    """依次尝试多个预编译正则，返回第一个匹配结果"""
+    for pattern in patterns:
+        match = _search(pattern, text)
+        if match:
+            return match
+    return None
+
+
+class _SessionResponse:
+    """HttpSession返回的响应，gzip/deflate正文边读边解压；关闭时正文已读完则将连接归还连接池，否则丢弃连接"""
+
+    # 可用zlib解压的Content-Encoding
+    ZLIB_ENCODINGS = ('gzip', 'x-gzip', 'deflate')
+
+    def __init__(self, session, key, conn, response, url):
+        self._session = session
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+        encoding = (response.getheader('Content-Encoding') or '').strip().lower()
+        # MAX_WBITS | 32：自动识别gzip与zlib头
+        self._decoder = zlib.decompressobj(zlib.MAX_WBITS | 32) if encoding in self.ZLIB_ENCODINGS else None
+
+    def read(self, amt=None):
+        if self._decoder is None:
+            return self._response.read(amt)
+        while True:
+            chunk = self._response.read(amt)
+            if not chunk:
+                return self._decoder.flush()
+            data = self._decoder.decompress(chunk)
+            # 解压器可能暂存数据，空结果不能返回给调用方（会被当作读取结束）
+            if data:
+                return data
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._response.isclosed():
+            self._session._release(self._key, self._conn)
+        else:
+            # 正文未读完，连接中残留数据，不能再复用
+            self._conn.close()
+        self._response.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class HttpSession:
+    """基于http.client的HTTP会话 - 各线程共享按主机划分的keep-alive连接池，连接异常时自动重试"""
+
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+    # 需要等待后重试的状态码，以及服务端Retry-After的最长等待秒数
+    RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+    MAX_RETRY_AFTER = 30
+    # 请求压缩传输，响应由_SessionResponse透明解压
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+    def __init__(self, timeout=30, max_retries=3, backoff_factor=0.3, max_redirects=5, pool_maxsize=16):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_redirects = max_redirects
+        # 每个主机最多保留的空闲连接数
+        self.pool_maxsize = pool_maxsize
+        self._idle = {}
+        self._pool_lock = threading.Lock()
+        # 配置了代理时交给urllib处理（http.client不支持代理）
+        self._proxies = urllib.request.getproxies()
+
+    def _acquire(self, key):
+        """从连接池取出一个空闲连接，没有时新建"""
+        with self._pool_lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        scheme, netloc = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(self, key, conn):
+        """将响应已读完的连接放回连接池，池满时关闭"""
+        with self._pool_lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._pool_lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _request(self, key, path, headers):
+        """发送一次GET请求，返回 (连接, 响应)；连接被服务器断开时重建连接并重试"""
+        for attempt in range(self.max_retries + 1):
+            conn = self._acquire(key)
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn, conn.getresponse()
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                if attempt >= self.max_retries:
+                    raise
+                # 第一次重试立即进行（通常是keep-alive连接已过期），之后指数退避
+                if attempt > 0:
+                    time.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+            except Exception:
+                conn.close()
+                raise
+
+    def get(self, url, headers=None):
+        """发送GET请求，返回支持with语句的响应对象；4xx/5xx抛出HTTPError"""
+        headers = headers or {}
+        if urllib.parse.urlsplit(url).scheme in self._proxies:
+            request = urllib.request.Request(url, headers=headers)
+            return urllib.request.urlopen(request, timeout=self.timeout)
+
+        headers = {'Accept-Encoding': self.ACCEPT_ENCODING, **headers}
+        redirects = 0
+        status_retries = 0
+        while True:
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                raise urllib.error.URLError(f'unsupported scheme: {parts.scheme}')
+            key = (parts.scheme, parts.netloc)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            conn, response = self._request(key, path, headers)
+
+            location = response.getheader('Location')
+            if response.status in self.REDIRECT_CODES and location:
+                response.read()
+                response.close()
+                self._release(key, conn)
+                url = urllib.parse.urljoin(url, location)
+                redirects += 1
+                if redirects > self.max_redirects:
+                    raise urllib.error.URLError(f'too many redirects: {url}')
+                continue
+
+            # 限流或服务端临时错误时等待后重试
+            if response.status in self.RETRY_STATUS_CODES and status_retries < self.max_retries:
+                delay = self._retry_delay(response, status_retries)
+                response.read()
+                response.close()
+                self._release(key, conn)
+                status_retries += 1
+                time.sleep(delay)
+                continue
+
+            if response.status >= 400:
+                response.read()
+                response.close()
+                self._release(key, conn)
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+            return _SessionResponse(self, key, conn, response, url)
+
+    def _retry_delay(self, response, attempt):
+        """重试前的等待秒数：优先使用Retry-After（秒数形式），否则指数退避"""
+        retry_after = (response.getheader('Retry-After') or '').strip()
+        if retry_after.isdigit():
+            return min(int(retry_after), self.MAX_RETRY_AFTER)
+        return self.backoff_factor * (2 ** attempt)
+
+
+class ImageDownloader:
+    """图片下载器"""
+
+    # 可直接保留的图片扩展名
+    IMAGE_EXTS = frozenset(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg', '.avif'))
+
+    # 流式下载的分块大小；已知大小不超过SMALL_IMAGE_BYTES的图片一次读完
+    CHUNK_SIZE = 64 * 1024
+    SMALL_IMAGE_BYTES = 256 * 1024
+
+    def __init__(self, log_callback=None, referer=None, max_workers=8, session=None,
+                 max_image_bytes=10 * 1024 * 1024, max_total_bytes=100 * 1024 * 1024):
+        self.log_callback = log_callback
+        self.max_workers = max_workers
+        self.session = session or HttpSession()
+        # 单张图片大小上限，以及每篇文章所有图片的总下载量上限
+        self.max_image_bytes = max_image_bytes
+        self.max_total_bytes = max_total_bytes
+        self._total_bytes = 0
+        self._bytes_lock = threading.Lock()
+        # 已确认存在的图片目录，避免每篇文章重复创建
+        self._dir_created = set()
+        # 最近一次download_images的失败原因 -> 张数
+        self.failure_reasons = Counter()
+        self._log_lock = threading.Lock()
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+            'Referer': referer or 'https://www.google.com/',
+        }
+
+    def log(self, message):
+        if self.log_callback:
+            # 下载在多个工作线程中进行，串行化日志回调
+            with self._log_lock:
+                self.log_callback(message)
+
+    def get_image_extension(self, url, content_type=None):
+        """获取图片扩展名"""
+        if content_type:
+            type_map = {
+                'image/jpeg': '.jpg',
+                'image/jpg': '.jpg',
+                'image/png': '.png',
+                'image/gif': '.gif',
+                'image/webp': '.webp',
+                'image/bmp': '.bmp',
+                'image/svg+xml': '.svg',
+                'image/avif': '.avif',
+            }
+            if content_type in type_map:
+                return type_map[content_type]
+
+        ext_match = _RE_IMAGE_URL_EXT.search(url)
+        if ext_match:
+            return '.' + ext_match.group(1).lower()
+
+        return '.jpg'
+
+    def _add_downloaded_bytes(self, count):
+        """累计已下载字节数，返回是否仍在总量上限内"""
+        with self._bytes_lock:
+            self._total_bytes += count
+            return self._total_bytes <= self.max_total_bytes
+
+    def download_image(self, url, save_path):
+        """下载单张图片，返回 (是否成功, 保存路径或失败原因)"""
+        temp_path = None
+        written = 0
+        if self._total_bytes > self.max_total_bytes:
+            return False, "总下载量超过上限"
+
+        try:
+            # 根据URL类型调整headers
+            headers = self.headers.copy()
+            if 'notion.com' in url or '/_next/image' in url:
+                headers['Accept'] = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+                headers['sec-fetch-dest'] = 'image'
+                headers['sec-fetch-mode'] = 'no-cors'
+                headers['sec-fetch-site'] = 'same-origin'
+
+            # 先流式写入临时文件，确定扩展名后再重命名，避免整张图片驻留内存
+            # 临时文件名唯一，并发下载同一张图片时互不覆盖
+            temp_path = save_path.with_name(f"{save_path.name}.{uuid.uuid4().hex}.part")
+            with self.session.get(url, headers=headers) as response:
+                # 根据Content-Length提前跳过过大的图片，不读取正文
+                content_length = response.headers.get('Content-Length', '')
+                if content_length.isdigit() and int(content_length) > self.max_image_bytes:
+                    self.log(f"跳过过大的图片: {int(content_length) // 1024} KB")
+                    return False, "图片超过大小上限"
+
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+                # 获取扩展名：优先按Content-Type，未知时才使用URL中的扩展名
+                ext = self.get_image_extension(url, content_type)
+
+                if save_path.suffix.lower() not in self.IMAGE_EXTS:
+                    save_path = save_path.with_suffix(ext)
+
+                chunk_size = self.CHUNK_SIZE
+                if content_length.isdigit() and 0 < int(content_length) <= self.SMALL_IMAGE_BYTES:
+                    chunk_size = int(content_length)
+
+                # 没有Content-Length时边下载边检查大小
+                with open(temp_path, 'wb') as f:
+                    while True:
+                        chunk = response.read(chunk_size)
+                        if not chunk:
+                            break
+                        if written + len(chunk) > self.max_image_bytes:
+                            raise ValueError("图片超过大小上限")
+                        written += len(chunk)
+                        if not self._add_downloaded_bytes(len(chunk)):
+                            raise ValueError("图片总下载量超过上限")
+                        f.write(chunk)
+
+            os.replace(temp_path, save_path)
+            return True, save_path
+        except Exception as e:
+            self.log(f"下载图片失败: {str(e)[:50]}")
+            # 失败图片的字节不计入总下载量
+            self._add_downloaded_bytes(-written)
+            if temp_path is not None and temp_path.exists():
+                temp_path.unlink()
+            return False, self._failure_reason(e)
+
+    def _failure_reason(self, error):
+        """将下载异常归类为简短的失败原因，用于汇总统计"""
+        if isinstance(error, urllib.error.HTTPError):
+            return f"HTTP {error.code}"
+        if isinstance(error, TimeoutError):
+            return "超时"
+        if isinstance(error, ValueError):
+            return str(error)
+        if isinstance(error, OSError):
+            return "网络错误"
+        return type(error).__name__
+
+    def download_images(self, image_urls, images_dir, progress_callback=None):
+        """批量下载图片（线程池并发下载），返回 (URL映射, 成功数, 失败数)；失败原因统计见failure_reasons"""
+        self.failure_reasons = Counter()
+        if not image_urls:
+            return {}, 0, 0
+
+        images_dir = Path(images_dir)
+        if images_dir not in self._dir_created:
+            images_dir.mkdir(parents=True, exist_ok=True)
+            self._dir_created.add(images_dir)
+
+        self._total_bytes = 0
+
+        # 一次列出目录中已有的文件，之后用集合判断，不再逐个stat
+        existing_names = {entry.name for entry in os.scandir(images_dir)}
+
+        # 文件名由URL哈希生成，其他文章或批次下载过的同一张图片直接复用，不再发起请求
+        results = {}
+        tasks = []
+        for url in image_urls:
+            # 重复的URL只处理一次
+            if url in results:
+                continue
+            filename = self._image_filename(url)
+            existing = self._find_existing_image(filename, existing_names)
+            if existing is not None:
+                results[url] = (Path('images') / existing).as_posix()
+                continue
+            # 先占位，避免重复的URL再次加入下载任务
+            results[url] = url
+            tasks.append((url, images_dir / filename))
+
+        reused = len(results) - len(tasks)
+        if reused:
+            self.log(f"复用已下载的图片: {reused} 张")
+
+        total = len(tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.download_image, url, save_path): url
+                for url, save_path in tasks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                if progress_callback:
+                    progress_callback(done, total, url)
+
+                # 成功时第二项为保存路径，失败时为失败原因
+                success, detail = future.result()
+                if success:
+                    # Use forward slash for cross-platform compatibility
+                    relative_path = Path('images') / detail.name
+                    results[url] = relative_path.as_posix()  # Always use forward slashes
+                    self.log(f"下载图片 {done}/{total}: {detail.name}")
+                else:
+                    results[url] = url
+                    self.failure_reasons[detail] += 1
+
+        # 按原始顺序返回映射
+        failed = sum(self.failure_reasons.values())
+        return {url: results[url] for url in image_urls}, len(results) - failed, failed
+
+    def _image_filename(self, url):
+        """按URL哈希生成不带扩展名的文件名；扩展名在下载时按Content-Type决定（CDN可能对.jpg返回WebP）"""
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _find_existing_image(self, filename, existing_names):
+        """按文件名主干在已有文件名集合中查找已下载的图片，不存在时返回None"""
+        for ext in self.IMAGE_EXTS:
+            if filename + ext in existing_names:
+                return filename + ext
+        return None
+
+
+class EpubConverter:
+    """EPUB电子书转换器 - 支持Pandoc和手动生成两种方式"""
+
+    # 缓存目录的总大小上限，超出后按修改时间淘汰最旧的文件
+    CACHE_MAX_BYTES = 200 * 1024 * 1024
+    PNG_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+    # EPUB阅读器普遍支持的图片格式，Pandoc路径下无需重新编码
+    EPUB_NATIVE_IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+
+    def __init__(self, log_callback=None, cache_dir=None, png_cache_dir=None):
+        self.log_callback = log_callback
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(tempfile.gettempdir()) / 'article_epub_cache'
+        self._png_cache_dir = Path(png_cache_dir) if png_cache_dir else Path(tempfile.gettempdir()) / 'article_png_cache'
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        print(message)
+
+    def _find_pandoc(self):
+        """查找Pandoc可执行文件路径"""
+        return _find_pandoc_cached()
+
+    def has_pandoc(self):
+        """检查Pandoc是否可用"""
+        return self._find_pandoc() is not None
+
+    def _markdown_to_html(self, md_content, title, start=0):
+        """将Markdown内容（从start位置开始）转换为HTML"""
+        # 优先使用mistune，未安装时使用内置的正则实现
+        if mistune is not None:
+            return mistune.html(md_content[start:])
+
+        # 单遍扫描处理标题、图片、链接、粗体、斜体、引用、代码、水平线和列表项
+        parts = []
+        last = start
+        for match in _MD_TOKEN_RE.finditer(md_content, start):
+            parts.append(md_content[last:match.start()])
+            parts.append(self._md_token_replace(match))
+            last = match.end()
+        parts.append(md_content[last:])
+        html = ''.join(parts)
+
+        # 将连续的列表项包装为ul
+        html = _MD_LIST_RE.sub(r'<ul>\g<0></ul>', html)
+
+        # 处理段落（将连续的非标签行包装为p标签）
+        result_lines = []
+        paragraph_content = []
+
+        for line in html.split('\n'):
+            stripped = line.strip()
+            # 空行或HTML标签行结束当前段落并原样保留，其余文本并入段落
+            if not stripped or (stripped[0] == '<' and (stripped[-1] == '>' or stripped[1:2] == '/')):
+                if paragraph_content:
+                    result_lines.append('<p>' + ' '.join(paragraph_content) + '</p>')
+                    paragraph_content = []
+                result_lines.append(line)
+            else:
+                paragraph_content.append(stripped)
+
+        # 处理最后的段落
+        if paragraph_content:
+            result_lines.append('<p>' + ' '.join(paragraph_content) + '</p>')
+
+        html = '\n'.join(result_lines)
+
+        # 清理多余空行
+        html = _MD_BLANK_LINES_RE.sub('\n\n', html)
+
+        return html
+
+    def _md_inline(self, text):
+        """转换文本中的行内Markdown语法"""
+        return _MD_INLINE_RE.sub(self._md_token_replace, text)
+
+    def _md_token_replace(self, match):
+        """根据命中的分组将单个Markdown记号转换为HTML"""
+        kind = match.lastgroup
+        if kind == 'codeblock':
+            return f"<pre><code>{match.group('codeblock_text')}</code></pre>"
+        if kind == 'heading':
+            level = len(match.group('heading_level'))
+            return f"<h{level}>{self._md_inline(match.group('heading_text'))}</h{level}>"
+        if kind == 'quote':
+            return f"<blockquote>{self._md_inline(match.group('quote_text'))}</blockquote>"
+        if kind == 'hr':
+            return '<hr/>'
+        if kind == 'li':
+            return f"<li>{self._md_inline(match.group('li_text'))}</li>"
+        if kind == 'img':
+            return f'<img src="{match.group("img_src")}" alt="{match.group("img_alt")}"/>'
+        if kind == 'link':
+            return f'<a href="{match.group("link_href")}">{self._md_inline(match.group("link_text"))}</a>'
+        if kind == 'code':
+            return f"<code>{match.group('code_text')}</code>"
+        if kind == 'bold':
+            return f"<strong>{match.group('bold_text')}</strong>"
+        return f"<em>{match.group('em_text')}</em>"
+
+    def _create_content_opf(self, title, author, book_id, images):
+        """创建content.opf文件"""
+        manifest_items = '\n'.join([
+            f'    <item id="content" href="content.xhtml" media-type="application/xhtml+xml"/>',
+            f'    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+            f'    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>',
+        ])
+
+        # 添加图片项
+        for i, img_info in enumerate(images):
+            img_id = f"img{i}"
+            img_path = img_info['epub_path']
+            media_type = img_info.get('media_type', self._get_media_type(img_path))
+            manifest_items += f'\n    <item id="{img_id}" href="{img_path}" media-type="{media_type}"/>'
+
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="BookId">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:title>{title}</dc:title>
+    <dc:creator>{author}</dc:creator>
+    <dc:language>zh-CN</dc:language>
+    <dc:identifier id="BookId">urn:uuid:{book_id}</dc:identifier>
+    <meta property="dcterms:modified">{datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")}</meta>
+  </metadata>
+  <manifest>
+{manifest_items}
+  </manifest>
+  <spine toc="ncx">
+    <itemref idref="content"/>
+  </spine>
+</package>'''
+
+    def _create_nav_xhtml(self, title):
+        """创建nav.xhtml导航文件"""
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head>
+  <title>Table of Contents</title>
+</head>
+<body>
+  <nav epub:type="toc">
+    <h1>Table of Contents</h1>
+    <ol>
+      <li><a href="content.xhtml">{title}</a></li>
+    </ol>
+  </nav>
+</body>
+</html>'''
+
+    def _create_toc_ncx(self, title, book_id):
+        """创建toc.ncx文件 (EPUB 2.0兼容)"""
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head>
+    <meta name="dtb:uid" content="urn:uuid:{book_id}"/>
+    <meta name="dtb:depth" content="1"/>
+    <meta name="dtb:totalPageCount" content="0"/>
+    <meta name="dtb:maxPageNumber" content="0"/>
+  </head>
+  <docTitle>
+    <text>{title}</text>
+  </docTitle>
+  <navMap>
+    <navPoint id="navpoint-1" playOrder="1">
+      <navLabel>
+        <text>{title}</text>
+      </navLabel>
+      <content src="content.xhtml"/>
+    </navPoint>
+  </navMap>
+</ncx>'''
+
+    def _create_content_xhtml(self, title, author, source_url, date, html_content):
+        """创建content.xhtml内容文件"""
+        # 包装内容 - 简化版本，避免重复
+        return f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+  <title>{title}</title>
+  <style type="text/css">
+    body {{
+      font-family: Georgia, "Times New Roman", serif;
+      line-height: 1.6;
+      margin: 1em;
+      padding: 0;
+    }}
+    h1 {{
+      font-size: 1.5em;
+      margin-top: 0.5em;
+      margin-bottom: 0.5em;
+      text-align: center;
+    }}
+    h2 {{
+      font-size: 1.3em;
+      margin-top: 1em;
+      border-bottom: 1px solid #ccc;
+    }}
+    h3 {{ font-size: 1.1em; margin-top: 0.8em; }}
+    p {{ margin: 0.5em 0; text-align: justify; }}
+    blockquote {{
+      margin: 0.5em 2em;
+      padding: 0.5em;
+      border-left: 3px solid #ccc;
+      background: #f9f9f9;
+    }}
+    img {{
+      max-width: 100%;
+      height: auto;
+      display: block;
+      margin: 1em auto;
+    }}
+    hr {{
+      border: none;
+      border-top: 1px solid #ccc;
+      margin: 1em 0;
+    }}
+    ul, ol {{ padding-left: 1.5em; }}
+    li {{ margin: 0.3em 0; }}
+    a {{ color: #0066cc; }}
+  </style>
+</head>
+<body>
+  <h1>{title}</h1>
+  <p style="text-align: center; color: #666; font-size: 0.9em;">
+    Author: {author} | Source: <a href="{source_url}">{source_url}</a> | Date: {date}
+  </p>
+  <hr/>
+  {html_content}
+</body>
+</html>'''
+
+    def _create_container_xml(self):
+        """创建container.xml"""
+        return '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>'''
+
+    def _get_media_type(self, filename):
+        """根据文件扩展名获取MIME类型"""
+        ext = Path(filename).suffix.lower()
+        types = {
+            '.jpg': 'image/jpeg',
+            '.jpeg': 'image/jpeg',
+            '.png': 'image/png',
+            '.gif': 'image/gif',
+            '.webp': 'image/webp',
+            '.svg': 'image/svg+xml',
+            '.avif': 'image/avif',
+            '.bmp': 'image/bmp',
+        }
+        return types.get(ext, 'application/octet-stream')
+
+    def _convert_image_to_png(self, img_path):
+        """将图片转换为PNG格式（用于EPUB兼容性）"""
+        try:
+            return _convert_image_to_png_worker(img_path)
+        except Exception as e:
+            self.log(f"  图片转换失败 {img_path}: {str(e)}")
+            return None
+
+    def _convert_images_to_png(self, img_paths):
+        """转换多张图片为PNG，按源文件内容哈希缓存转换结果，转换失败的位置为None"""
+        results = [None] * len(img_paths)
+        pending = []
+
+        for i, img_path in enumerate(img_paths):
+            cache_path = self._png_cache_dir / f"{hashlib.sha1(Path(img_path).read_bytes()).hexdigest()}.png"
+            if cache_path.exists():
+                try:
+                    results[i] = cache_path.read_bytes()
+                    # 更新修改时间，供LRU淘汰使用
+                    os.utime(cache_path)
+                    continue
+                except OSError:
+                    pass
+            pending.append((i, cache_path))
+
+        converted = self._convert_images_in_pool([img_paths[i] for i, _ in pending])
+
+        if pending:
+            try:
+                self._png_cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                pass
+
+        written = False
+        for (i, cache_path), png_data in zip(pending, converted):
+            results[i] = png_data
+            if png_data:
+                try:
+                    temp_path = cache_path.with_name(f"{cache_path.stem}.{uuid.uuid4().hex}.tmp")
+                    temp_path.write_bytes(png_data)
+                    os.replace(temp_path, cache_path)
+                    written = True
+                except OSError:
+                    pass
+
+        # 只有写入了新的PNG才可能超出上限，此时再淘汰旧缓存
+        if written:
+            _evict_cache(self._png_cache_dir, '*.png', self.PNG_CACHE_MAX_BYTES)
+
+        return results
+
+    def _convert_images_in_pool(self, img_paths):
+        """使用进程池并行转换多张图片，转换失败的位置为None"""
+        if len(img_paths) < 2:
+            return [self._convert_image_to_png(path) for path in img_paths]
+
+        results = [None] * len(img_paths)
+        try:
+            workers = min(len(img_paths), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_convert_image_to_png_worker, str(path)): i
+                    for i, path in enumerate(img_paths)
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        self.log(f"  图片转换失败 {img_paths[i]}: {str(e)}")
+        except OSError as e:
+            # 无法创建子进程时退回串行转换
+            self.log(f"  无法启动进程池，改为串行转换: {e}")
+            return [self._convert_image_to_png(path) for path in img_paths]
+
+        return results
+
+    def _markdown_body_offset(self, md_content):
+        """返回正文的起始位置（跳过标题、元数据引用块、空行和第一个分隔线）"""
+        pos = 0
+        length = len(md_content)
+
+        while pos < length:
+            end = md_content.find('\n', pos)
+            next_pos = length if end < 0 else end + 1
+            stripped = md_content[pos:next_pos].strip()
+
+            # 跳过标题行 (# Title)
+            if stripped.startswith('# '):
+                pos = next_pos
+                continue
+            # 跳过元数据引用块 (> **xxx**: yyy)
+            if stripped.startswith('>') and ('**作者**' in stripped or '**原文链接**' in stripped or '**保存日期**' in stripped):
+                pos = next_pos
+                continue
+            # 跳过空行在header区域
+            if not stripped:
+                pos = next_pos
+                continue
+            # 第一个分隔线后开始正文
+            if stripped == '---':
+                return next_pos
+            # 如果既不是标题、引用块、空行也不是分隔线，说明header结束了
+            return pos
+
+        return pos
+
+    def _strip_markdown_header(self, md_content):
+        """移除Markdown内容的元数据头部"""
+        return md_content[self._markdown_body_offset(md_content):]
+
+    def _md_to_html_stripping_header(self, md_content, title):
+        """跳过元数据头部并将正文转换为HTML，不生成去除头部后的中间文本"""
+        return self._markdown_to_html(md_content, title, start=self._markdown_body_offset(md_content))
+
+    def _convert_with_pandoc(self, md_content, title, author, source_url, output_path, images_dir=None):
+        """
+        使用Pandoc将Markdown转换为EPUB
+        步骤: MD -> HTML -> EPUB (两步转换确保图片正确处理)
+        内容通过stdin/stdout传递，临时目录仅在有本地图片时用于存放图片
+        """
+        pandoc = self._find_pandoc()
+        if not pandoc:
+            return False, "Pandoc not found"
+
+        import subprocess
+
+        temp_dir = None
+        try:
+            # 处理MD内容 - 移除头部元数据
+            md_clean = self._strip_markdown_header(md_content)
+
+            # 复制本地图片到临时目录并更新路径
+            image_refs = re.findall(r'!\[[^\]]*\]\(([^)]+)\)', md_clean)
+            img_counter = 0
+
+            if images_dir and image_refs:
+                images_dir = Path(images_dir).absolute()
+                local_images = []
+                for img_ref in image_refs:
+                    src_path = self._resolve_local_image(img_ref, images_dir)
+                    if src_path is not None and src_path.exists():
+                        local_images.append((img_ref, src_path))
+
+                if local_images:
+                    # 创建临时目录 - 使用绝对路径
+                    temp_dir = Path(tempfile.mkdtemp()).absolute()
+                    media_dir = temp_dir / 'media'
+                    media_dir.mkdir(exist_ok=True)
+
+                    # PNG/JPEG直接硬链接复用原文件，其余格式转换为PNG以确保最大兼容性
+                    to_convert = [src_path for _, src_path in local_images
+                                  if src_path.suffix.lower() not in self.EPUB_NATIVE_IMAGE_EXTS]
+                    png_blobs = iter(self._convert_images_to_png(to_convert))
+
+                    for img_ref, src_path in local_images:
+                        img_counter += 1
+                        ext = src_path.suffix.lower()
+
+                        if ext in self.EPUB_NATIVE_IMAGE_EXTS:
+                            new_name = f"img_{img_counter}{ext}"
+                            self._link_or_copy(src_path, media_dir / new_name)
+                            md_clean = md_clean.replace(img_ref, f"media/{new_name}")
+                            continue
+
+                        new_name = f"img_{img_counter}.png"
+                        dst_path = media_dir / new_name
+                        png_data = next(png_blobs)
+
+                        if png_data:
+                            dst_path.write_bytes(png_data)
+                            md_clean = md_clean.replace(img_ref, f"media/{new_name}")
+                            self.log(f"  转换图片: {src_path.name} -> PNG")
+                        else:
+                            # 转换失败，直接复制原图
+                            ext = src_path.suffix
+                            dst_path = media_dir / f"img_{img_counter}{ext}"
+                            shutil.copy2(src_path, dst_path)
+                            md_clean = md_clean.replace(img_ref, f"media/img_{img_counter}{ext}")
+                            self.log(f"  复制图片(原图): {src_path.name}")
+
+            # 添加标题作为一级标题（如果不存在）
+            if not md_clean.strip().startswith('#'):
+                md_clean = f"# {title}\n\n{md_clean}"
+
+            output_path = Path(output_path).absolute()
+
+            # 步骤1: MD -> HTML（从stdin读取，输出到stdout）
+            # 步骤2: HTML -> EPUB（直接读取步骤1的stdout，写入最终位置旁的临时文件）
+            self.log("  Pandoc: MD -> HTML -> EPUB...")
+            cmd_md_to_html = [
+                pandoc,
+                '-f', 'markdown',
+                '-t', 'html',
+                '--standalone',
+            ]
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            part_path = output_path.with_name(output_path.name + '.part')
+
+            # 简化命令 - 使用metadata参数直接传递标题和作者
+            cmd_html_to_epub = [
+                pandoc,
+                '-o', str(part_path),
+                '-f', 'html',
+                '-t', 'epub3',
+                f'--metadata=title:{title}',
+                f'--metadata=author:{author}',
+            ]
+
+            # 如果有图片，添加资源路径
+            if img_counter > 0:
+                cmd_html_to_epub.append(f'--resource-path={temp_dir}')
+
+            # 两步通过管道串联，HTML与EPUB都不经过内存；stderr写入临时文件避免缓冲区无限增长
+            with tempfile.TemporaryFile() as err_html, tempfile.TemporaryFile() as err_epub:
+                md_to_html = subprocess.Popen(cmd_md_to_html, stdin=subprocess.PIPE,
+                                              stdout=subprocess.PIPE, stderr=err_html)
+                html_to_epub = subprocess.Popen(cmd_html_to_epub, stdin=md_to_html.stdout,
+                                                stdout=subprocess.DEVNULL, stderr=err_epub)
+                # 关闭父进程持有的管道读端，步骤2提前退出时步骤1能收到SIGPIPE
+                md_to_html.stdout.close()
+                try:
+                    md_to_html.stdin.write(md_clean.encode('utf-8'))
+                    md_to_html.stdin.close()
+                except BrokenPipeError:
+                    pass
+                md_to_html.wait()
+                html_to_epub.wait()
+
+                for proc, err_file, step in ((md_to_html, err_html, 'MD->HTML'),
+                                             (html_to_epub, err_epub, 'HTML->EPUB')):
+                    if proc.returncode != 0:
+                        err_file.seek(0)
+                        stderr_msg = err_file.read(4096).decode('utf-8', errors='replace')
+                        self.log(f"  Pandoc {step} 错误: {stderr_msg[:200]}")
+                        if part_path.exists():
+                            part_path.unlink()
+                        return False, f"Pandoc {step} failed: {stderr_msg[:200]}"
+
+            # 验证EPUB内容已生成
+            if not part_path.exists() or part_path.stat().st_size == 0:
+                if part_path.exists():
+                    part_path.unlink()
+                return False, "EPUB file was not created or is empty"
+
+            # 生成完成后再替换最终文件，避免留下不完整的EPUB
+            os.replace(part_path, output_path)
+
+            self.log(f"EPUB创建成功 (Pandoc): {output_path.name}")
+            return True, str(output_path)
+
+        except Exception as e:
+            self.log(f"Pandoc转换失败: {str(e)}")
+            return False, str(e)
+
+        finally:
+            # 清理临时目录
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _link_or_copy(self, src_path, dst_path):
+        """优先创建硬链接避免复制图片数据，跨文件系统时退回复制"""
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            shutil.copy2(src_path, dst_path)
+
+    def _resolve_local_image(self, img_ref, images_dir):
+        """将Markdown中的图片引用解析为本地文件路径，网络图片返回None"""
+        if img_ref.startswith('images/'):
+            return images_dir.parent / img_ref
+        elif not img_ref.startswith('http'):
+            return images_dir / img_ref
+        return None
+
+    def _epub_cache_key(self, md_content, title, author, source_url, images_dir):
+        """根据文章内容和引用的本地图片计算缓存键"""
+        digest = hashlib.sha1()
+        for part in (md_content, title, author, source_url):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+
+        if images_dir:
+            images_dir = Path(images_dir)
+            for img_ref in re.findall(r'!\[[^\]]*\]\(([^)]+)\)', md_content):
+                img_path = self._resolve_local_image(img_ref, images_dir)
+                if img_path is not None and img_path.exists():
+                    digest.update(img_path.read_bytes())
+
+        return digest.hexdigest()
+
+    def _store_in_cache(self, epub_path, cache_path):
+        """将生成的EPUB写入缓存目录（先写临时文件再原子替换）"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.stem}.{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(epub_path, temp_path)
+            os.replace(temp_path, cache_path)
+            _evict_cache(self.cache_dir, '*.epub', self.CACHE_MAX_BYTES)
+        except OSError as e:
+            self.log(f"  写入EPUB缓存失败: {e}")
+
+    def convert_to_epub(self, md_content, title, author, source_url, output_path, images_dir=None):
+        """
+        将Markdown内容转换为EPUB文件
+        相同内容（含引用的本地图片）直接复用缓存的EPUB，否则优先使用Pandoc，
+        如果不可用则使用手动生成
+
+        Args:
+            md_content: Markdown内容
+            title: 书名/标题
+            author: 作者
+            source_url: 原文链接
+            output_path: EPUB输出路径
+            images_dir: 图片目录路径（如果包含本地图片）
+
+        Returns:
+            tuple: (是否成功, 输出路径或错误信息)
+        """
+        cache_path = self.cache_dir / f"{self._epub_cache_key(md_content, title, author, source_url, images_dir)}.epub"
+        if cache_path.exists():
+            try:
+                output_path = Path(output_path)
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(cache_path, output_path)
+                # 更新修改时间，供LRU淘汰使用
+                os.utime(cache_path)
+                self.log(f"EPUB创建成功 (缓存): {output_path.name}")
+                return True, str(output_path)
+            except OSError as e:
+                self.log(f"读取EPUB缓存失败，重新生成: {e}")
+
+        success, result = self._build_epub(md_content, title, author, source_url, output_path, images_dir)
+        if success:
+            self._store_in_cache(result, cache_path)
+        return success, result
+
+    def _build_epub(self, md_content, title, author, source_url, output_path, images_dir=None):
+        """生成EPUB文件，优先使用Pandoc，失败时手动生成"""
+        # 优先尝试使用Pandoc
+        if self.has_pandoc():
+            self.log("正在转换为EPUB格式 (使用Pandoc)...")
+            success, result = self._convert_with_pandoc(
+                md_content, title, author, source_url, output_path, images_dir
+            )
+            if success:
+                return True, result
+            else:
+                self.log(f"Pandoc转换失败，尝试手动生成: {result}")
+                # Pandoc失败，继续尝试手动生成
+
+        # 手动生成EPUB
+        self.log("正在转换为EPUB格式 (手动生成)...")
+        import zipfile
+
+        try:
+
+            # 生成唯一ID
+            book_id = str(uuid.uuid4())
+
+            # 提取日期
+            date = datetime.now().strftime('%Y-%m-%d')
+
+            # 查找所有图片引用
+            image_refs = re.findall(r'!\[[^\]]*\]\(([^)]+)\)', md_content)
+            images = []
+
+            # 处理本地图片
+            if images_dir and image_refs:
+                self.log(f"处理 {len(image_refs)} 张图片...")
+                images_dir = Path(images_dir)
+
+                local_images = []
+                for i, img_ref in enumerate(image_refs):
+                    # 处理相对路径
+                    img_path = self._resolve_local_image(img_ref, images_dir)
+                    if img_path is None:
+                        continue  # 跳过网络图片
+
+                    if img_path.exists():
+                        local_images.append((i, img_ref, img_path))
+
+                # 并行转换图片为PNG格式以提高兼容性
+                png_blobs = self._convert_images_to_png([img_path for _, _, img_path in local_images])
+
+                for (i, img_ref, img_path), png_data in zip(local_images, png_blobs):
+                    img_filename = f"img_{i}.png"
+                    epub_img_path = f"images/{img_filename}"
+
+                    if png_data:
+                        images.append({
+                            'original_ref': img_ref,
+                            'epub_path': epub_img_path,
+                            'image_data': png_data,
+                            'media_type': 'image/png'
+                        })
+                        self.log(f"  包含图片: {img_filename}")
+                    else:
+                        # 如果转换失败，尝试直接使用原图
+                        img_data = img_path.read_bytes()
+                        img_filename_orig = f"img_{i}{img_path.suffix}"
+                        epub_img_path_orig = f"images/{img_filename_orig}"
+                        images.append({
+                            'original_ref': img_ref,
+                            'epub_path': epub_img_path_orig,
+                            'image_data': img_data,
+                            'media_type': self._get_media_type(img_path.name)
+                        })
+                        self.log(f"  包含图片(原图): {img_filename_orig}")
+
+            # 更新Markdown中的图片路径为EPUB路径（单遍扫描，长路径优先避免前缀冲突）
+            md_updated = md_content
+            if images:
+                path_map = {}
+                for img_info in images:
+                    # 同一引用出现多次时使用第一张
+                    path_map.setdefault(img_info['original_ref'], img_info['epub_path'])
+                path_pattern = re.compile('|'.join(map(re.escape, sorted(path_map, key=len, reverse=True))))
+                md_updated = path_pattern.sub(lambda m: path_map[m.group(0)], md_content)
+
+            # 转换Markdown到HTML - 跳过头部元数据
+            html_content = self._md_to_html_stripping_header(md_updated, title)
+
+            # 创建EPUB文件
+            output_path = Path(output_path)
+
+            # 先在内存中组装zip，最后一次性写入磁盘
+            buffer = io.BytesIO()
+            # 文本条目使用最快的压缩级别
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as epub:
+                # 1. mimetype必须第一个且不压缩
+                epub.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+
+                # 2. META-INF/container.xml
+                epub.writestr('META-INF/container.xml', self._create_container_xml())
+
+                # 3. OEBPS/content.opf
+                epub.writestr('OEBPS/content.opf',
+                              self._create_content_opf(title, author, book_id, images))
+
+                # 4. OEBPS/nav.xhtml (EPUB 3.0)
+                epub.writestr('OEBPS/nav.xhtml', self._create_nav_xhtml(title))
+
+                # 5. OEBPS/toc.ncx (EPUB 2.0 compatibility)
+                epub.writestr('OEBPS/toc.ncx', self._create_toc_ncx(title, book_id))
+
+                # 6. OEBPS/content.xhtml
+                epub.writestr('OEBPS/content.xhtml',
+                              self._create_content_xhtml(title, author, source_url, date, html_content))
+
+                # 7. 添加图片 - PNG/JPEG等本身已压缩，直接存储；SVG/BMP仍然压缩
+                for img_info in images:
+                    if img_info['media_type'] in ('image/svg+xml', 'image/bmp'):
+                        compress_type = zipfile.ZIP_DEFLATED
+                    else:
+                        compress_type = zipfile.ZIP_STORED
+                    epub.writestr(f"OEBPS/{img_info['epub_path']}", img_info['image_data'],
+                                  compress_type=compress_type)
+
+            output_path.write_bytes(buffer.getvalue())
+
+            self.log(f"EPUB创建成功: {output_path.name}")
+            return True, str(output_path)
+
+        except Exception as e:
+            self.log(f"EPUB转换失败: {str(e)}")
+            return False, str(e)
+
+
+def _convert_to_epub_worker(md_content, title, author, source_url, output_path, images_dir):
+    """生成EPUB（模块级函数，可在进程池中执行），返回 (是否成功, 输出路径或错误信息)"""
+    return EpubConverter().convert_to_epub(md_content, title, author, source_url, output_path, images_dir)
+
+
+class GeneralArticleFetcher:
+    """通用文章获取器 - 支持微信公众号、Notion博客等"""
+
+    # URL特征与来源类型的对应关系，按顺序匹配
+    _SOURCE_TYPES = (
+        ('mp.weixin.qq.com', 'wechat'),
+        ('notion.com', 'notion'),
+        ('notion.site', 'notion'),
+        ('medium.com', 'medium'),
+        ('zhuanlan.zhihu.com', 'zhihu'),
+    )
+
+    # 各来源的标题、作者和正文区域候选正则，按优先级排列
+    _WECHAT_TITLE_PATTERNS = (_RE_META_OG_TITLE, _RE_WECHAT_TITLE, _RE_TITLE_TAG)
+    _WECHAT_AUTHOR_PATTERNS = (_RE_META_AUTHOR, _RE_WECHAT_NICKNAME)
+    _WECHAT_CONTENT_PATTERNS = (_RE_WECHAT_CONTENT, _RE_WECHAT_RICH_CONTENT)
+    _NOTION_TITLE_PATTERNS = (_RE_META_OG_TITLE, _RE_META_TITLE, _RE_H1, _RE_TITLE_TAG)
+    _NOTION_AUTHOR_PATTERNS = (_RE_META_AUTHOR, _RE_NOTION_AUTHOR_NAME, _RE_NOTION_BY_AUTHOR)
+    _NOTION_CONTENT_PATTERNS = (_RE_NOTION_ARTICLE, _RE_NOTION_PAGE_CONTENT, _RE_ARTICLE, _RE_MAIN)
+    _GENERAL_TITLE_PATTERNS = (_RE_META_OG_TITLE, _RE_META_TITLE, _RE_META_TWITTER_TITLE, _RE_H1, _RE_TITLE_TAG)
+    _GENERAL_AUTHOR_PATTERNS = (_RE_META_AUTHOR, _RE_META_ARTICLE_AUTHOR, _RE_SPAN_AUTHOR)
+
+    # 正文中需要整块移除的非内容元素
+    _WECHAT_STRIP_TAGS = ('script', 'style')
+    _NOTION_STRIP_TAGS = ('script', 'style')
+    _NOTION_FALLBACK_STRIP_TAGS = ('header', 'footer', 'nav', 'script', 'style')
+    _GENERAL_STRIP_TAGS = ('script', 'style', 'header', 'footer', 'nav', 'aside')
+
+    # 保留样式HTML使用的微信公众号样式CSS - 使用较低优先级，让内联样式优先生效
+    _STYLED_CSS = """
+        * {
+            box-sizing: border-box;
+        }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+            line-height: 1.8;
+            color: #333;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+            background: #fff;
+        }
+        .article-header {
+            border-bottom: 1px solid #eee;
+            padding-bottom: 20px;
+            margin-bottom: 20px;
+        }
+        .article-title {
+            font-size: 24px;
+            font-weight: bold;
+            margin-bottom: 10px;
+            color: #000;
+        }
+        .article-meta {
+            font-size: 14px;
+            color: #999;
+        }
+        .article-meta a {
+            color: #576b95;
+            text-decoration: none;
+        }
+        .article-content {
+            font-size: 17px;
+            overflow-wrap: break-word;
+        }
+        /* 基础段落样式 - 但内联样式会覆盖这些 */
+        .article-content p {
+            margin: 1em 0;
+        }
+        /* 图片样式 */
+        .article-content img {
+            max-width: 100% !important;
+            height: auto !important;
+        }
+        /* 表格样式 */
+        .article-content table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 1em 0;
+        }
+        .article-content th, .article-content td {
+            border: 1px solid #ddd;
+            padding: 8px 12px;
+        }
+        /* 引用块样式 */
+        .article-content blockquote {
+            border-left: 4px solid #1aad19;
+            padding: 10px 20px;
+            margin: 1em 0;
+            background-color: #f8f8f8;
+        }
+        /* 代码块样式 */
+        .article-content pre {
+            background: #f5f5f5;
+            padding: 15px;
+            border-radius: 5px;
+            overflow-x: auto;
+        }
+        .article-content code {
+            background: #f5f5f5;
+            padding: 2px 6px;
+            border-radius: 3px;
+            font-family: Consolas, Monaco, monospace;
+        }
+        .article-content pre code {
+            background: none;
+            padding: 0;
+        }
+        /* 链接样式 */
+        .article-content a {
+            color: #576b95;
+        }
+        /* 分隔线 */
+        .article-content hr {
+            border: none;
+            border-top: 1px solid #eee;
+            margin: 2em 0;
+        }
+        /* 列表样式 */
+        .article-content ul, .article-content ol {
+            padding-left: 2em;
+        }
+        /* section标签处理 */
+        .article-content section {
+            display: block;
+        }
+        /* 重要：让所有内联样式优先生效 */
+        .article-content [style] {
+            /* 内联样式自动具有更高优先级 */
+        }
+        """
+
+    # 安装lxml时用XPath定位正文区域，优先级与对应的正则候选一致
+    _LXML_NOTION_CONTENT_XPATHS = (
+        '//article[@class]',
+        '//div[contains(@class, "notion-page-content")]',
+        '//article',
+        '//main',
+    )
+    _LXML_GENERAL_CONTENT_XPATHS = (
+        '//article',
+        '//main',
+        '//div[contains(@class, "post-content")]',
+        '//div[contains(@class, "article-content")]',
+        '//div[contains(@class, "entry-content")]',
+        '//div[contains(@class, "content")]',
+        '//div[@id="content"]',
+        '//div[@id="article"]',
+    )
+
+    # 网页缓存：有效期内直接复用，过期后带ETag/Last-Modified条件请求重新验证
+    HTML_CACHE_TTL = 24 * 3600
+    HTML_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+    # 网页分块读取；微信文章正文之后是大段脚本，正文结束标记与作者信息都已读到时不再读取剩余部分
+    HTML_CHUNK_SIZE = 64 * 1024
+    _WECHAT_START_MARKER = 'id="js_content"'
+    _WECHAT_END_MARKER = 'rich_media_tool'
+    _WECHAT_AUTHOR_MARKERS = ('name="author"', 'var nickname')
+
+    def __init__(self, log_callback=None, session=None, cache_dir=None):
+        self.log_callback = log_callback
+        # 网页和图片共用同一个会话，复用到同一主机的连接
+        self.session = session or HttpSession()
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(tempfile.gettempdir()) / 'article_html_cache'
+        self.image_downloader = ImageDownloader(log_callback, session=self.session)
+        self.image_urls = []
+        self.raw_html = ""  # 保存原始HTML
+        self.source_type = "unknown"  # 文章来源类型
+        # 新获取的网页缓存条目，正文区域提取成功后才写入，避免缓存验证页、登录页等
+        self._pending_html_cache = None
+        self._content_matched = False
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        print(message)
+
+    def _detect_source_type(self, url, html):
+        """检测文章来源类型"""
+        for domain, source_type in self._SOURCE_TYPES:
+            if domain in url:
+                return source_type
+        return 'general'
+
+    def fetch_article(self, url, today=None):
+        """获取并解析文章；today为保存日期字符串，批量下载时由调用方统一传入"""
+        self.log("正在获取文章...")
+        self.image_urls = []
+        self.raw_html = ""
+
+        html = self._fetch_html(url)
+        if not html:
+            return None
+
+        self.raw_html = html
+        self.log("正在解析内容...")
+        self._content_matched = True
+
+        # 检测来源类型
+        self.source_type = self._detect_source_type(url, html)
+        self.log(f"来源类型: {self.source_type}")
+
+        # 更新图片下载器的 Referer
+        self.image_downloader.headers['Referer'] = url
+
+        # 根据来源类型选择解析方法
+        if self.source_type == 'wechat':
+            title, author, content_html = self._extract_wechat_content(html)
+        elif self.source_type == 'notion':
+            title, author, content_html = self._extract_notion_content(html)
+        else:
+            title, author, content_html = self._extract_general_content(html)
+
+        if self._pending_html_cache and self._content_matched and content_html.strip():
+            self._store_html_cache(*self._pending_html_cache)
+        self._pending_html_cache = None
+
+        if not title:
+            title = "未命名文章"
+
+        self.log(f"标题: {title}")
+        self.log(f"作者: {author}")
+
+        # 提取图片URL
+        self.image_urls = self._extract_image_urls(content_html, url)
+        self.log(f"图片数量: {len(self.image_urls)}")
+
+        # 保存日期只计算一次，Markdown和HTML共用
+        if today is None:
+            today = datetime.now().strftime('%Y-%m-%d')
+
+        # 生成Markdown
+        md_content = self._html_to_markdown(content_html)
+        md_with_header = self._generate_markdown(url, title, author, md_content, today)
+
+        # 生成保留样式的HTML
+        html_content = self._generate_styled_html(url, title, author, content_html, today)
+
+        return {
+            'title': title,
+            'author': author,
+            'content': md_with_header,
+            'html_content': html_content,
+            'content_html': content_html,
+            'filename': self._sanitize_filename(title),
+            'image_urls': self.image_urls,
+            'source_type': self.source_type
+        }
+
+    def _fetch_html(self, url):
+        """获取HTML内容（优先使用本地缓存）；新获取的内容由fetch_article在提取到正文后写入缓存"""
+        self._pending_html_cache = None
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        }
+
+        cache_path = self.cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+        cached = self._load_html_cache(cache_path)
+        if cached:
+            if time.time() - cached.get('fetched_at', 0) < self.HTML_CACHE_TTL:
+                self.log("使用缓存的网页")
+                return cached['html']
+            # 缓存已过期，条件请求：内容未变化时服务器返回304，不传输正文
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    self.log("网页未修改，使用缓存")
+                    html = cached['html']
+                else:
+                    html = self._read_html(response, url)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            # 走代理时由urlopen发请求，304会以HTTPError抛出
+            if e.code != 304 or not cached:
+                self.log(f"网络错误: {e}")
+                return None
+            self.log("网页未修改，使用缓存")
+            html = cached['html']
+            etag = e.headers.get('ETag')
+            last_modified = e.headers.get('Last-Modified')
+        except urllib.error.URLError as e:
+            self.log(f"网络错误: {e}")
+            return None
+        except Exception as e:
+            self.log(f"获取失败: {e}")
+            return None
+
+        if cached:
+            etag = etag or cached.get('etag')
+            last_modified = last_modified or cached.get('last_modified')
+        self._pending_html_cache = (cache_path, {
+            'url': url,
+            'fetched_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'html': html,
+        })
+        return html
+
+    def _read_html(self, response, url):
+        """分块读取并增量解码网页，微信文章读到所需内容后提前结束"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        stop_early = self._detect_source_type(url, '') == 'wechat'
+        # 正文起点在全文中的偏移；<head>里的样式、脚本也可能出现结束标记，只在正文开始之后查找
+        content_at = -1
+        seen_end = seen_author = False
+        chunks = []
+        tail = ''
+        read_len = 0
+        while True:
+            data = response.read(self.HTML_CHUNK_SIZE)
+            if not data:
+                chunks.append(decoder.decode(b'', final=True))
+                break
+            text = decoder.decode(data)
+            chunks.append(text)
+            read_len += len(text)
+            if stop_early:
+                # 带上前一块的末尾，避免标记被分块边界截断
+                window = tail + text
+                window_at = read_len - len(window)
+                if content_at < 0:
+                    index = window.find(self._WECHAT_START_MARKER)
+                    if index >= 0:
+                        content_at = window_at + index
+                if content_at >= 0 and not seen_end:
+                    # 结束标记出现在正文之后时，再确认正文正则已能完整匹配
+                    if self._WECHAT_END_MARKER in window[max(0, content_at - window_at):]:
+                        seen_end = _RE_WECHAT_CONTENT.search(''.join(chunks)) is not None
+                seen_author = seen_author or any(marker in window for marker in self._WECHAT_AUTHOR_MARKERS)
+                if seen_end and seen_author:
+                    break
+                tail = window[-64:]
+        return ''.join(chunks)
+
+    def _load_html_cache(self, cache_path):
+        """读取网页缓存，不存在或损坏时返回None"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cached if isinstance(cached, dict) and isinstance(cached.get('html'), str) else None
+
+    def _store_html_cache(self, cache_path, entry):
+        """写入网页缓存（先写临时文件再原子替换），并淘汰超出总大小上限的旧缓存"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.stem}.{uuid.uuid4().hex}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+            _evict_cache(self.cache_dir, '*.json', self.HTML_CACHE_MAX_BYTES)
+        except OSError as e:
+            self.log(f"写入网页缓存失败: {e}")
+
+    def _extract_wechat_content(self, html):
+        """提取微信公众号文章标题、作者和内容HTML"""
+        # 提取标题
+        title_match = _search_first(self._WECHAT_TITLE_PATTERNS, html)
+
+        title = ""
+        if title_match:
+            title = _RE_TAG.sub('', title_match.group(1)).strip()
+            title = _RE_WECHAT_TITLE_SUFFIX.sub('', title)
+
+        # 提取作者
+        author_match = _search_first(self._WECHAT_AUTHOR_PATTERNS, html)
+        author = author_match.group(1) if author_match else "未知作者"
+
+        # 提取内容区域 - 保留原始HTML（包括所有内联样式）
+        content_match = _search_first(self._WECHAT_CONTENT_PATTERNS, html)
+
+        if content_match:
+            content_html = content_match.group(1)
+        else:
+            self.log("警告: 使用备用解析方式")
+            self._content_matched = False
+            content_html = html
+
+        # 清理脚本和样式标签，但保留内联style属性
+        content_html = _strip_tags(content_html, self._WECHAT_STRIP_TAGS)
+
+        return title, author, content_html
+
+    def _extract_notion_content(self, html):
+        """提取Notion博客文章标题、作者和内容HTML"""
+        # 提取标题
+        title_match = _search_first(self._NOTION_TITLE_PATTERNS, html)
+
+        title = ""
+        if title_match:
+            title = _RE_TAG.sub('', title_match.group(1)).strip()
+            title = _RE_NOTION_TITLE_SUFFIX.sub('', title)
+
+        # 提取作者
+        author_match = _search_first(self._NOTION_AUTHOR_PATTERNS, html)
+        author = author_match.group(1) if author_match else "Notion"
+
+        # 提取内容区域 - Notion的文章通常在 article 标签、notion-page-content 或 main 中
+        content_html = _lxml_inner_html(html, self._LXML_NOTION_CONTENT_XPATHS, self._NOTION_STRIP_TAGS)
+        if content_html:
+            return title, author, content_html
+
+        content_match = _search_first(self._NOTION_CONTENT_PATTERNS, html)
+
+        if content_match:
+            # 清理脚本和样式标签
+            content_html = _strip_tags(content_match.group(1), self._NOTION_STRIP_TAGS)
+        else:
+            self.log("警告: Notion内容解析使用备用方式")
+            self._content_matched = False
+            # 移除头部、尾部、导航、脚本和样式等非内容区域，保留主要内容
+            content_html = _strip_tags(html, self._NOTION_FALLBACK_STRIP_TAGS)
+
+        return title, author, content_html
+
+    def _extract_general_content(self, html):
+        """提取通用网页文章标题、作者和内容HTML"""
+        # 提取标题
+        title_match = _search_first(self._GENERAL_TITLE_PATTERNS, html)
+
+        title = ""
+        if title_match:
+            title = _RE_TAG.sub('', title_match.group(1)).strip()
+
+        # 提取作者
+        author_match = _search_first(self._GENERAL_AUTHOR_PATTERNS, html)
+        author = "未知作者"
+        if author_match:
+            author = _RE_TAG.sub('', author_match.group(1)).strip()
+            if not author:
+                author = "未知作者"
+
+        # 提取内容区域 - 尝试多种常见的内容区域选择器
+        content_html = _lxml_inner_html(html, self._LXML_GENERAL_CONTENT_XPATHS, self._GENERAL_STRIP_TAGS)
+        if content_html:
+            return title, author, content_html
+
+        content_html = ""
+
+        # 尝试 article 标签
+        content_match = _search(_RE_ARTICLE, html)
+        if content_match:
+            content_html = content_match.group(1)
+
+        # 尝试 main 标签
+        if not content_html:
+            content_match = _search(_RE_MAIN, html)
+            if content_match:
+                content_html = content_match.group(1)
+
+        # 尝试常见的内容class
+        if not content_html:
+            content_match = _search_first(_RE_CONTENT_CLASSES, html)
+            if content_match:
+                content_html = content_match.group(1)
+
+        # 如果还是没有找到，使用整个body
+        if not content_html:
+            self.log("警告: 通用内容解析使用备用方式")
+            self._content_matched = False
+            content_match = _search(_RE_BODY, html)
+            if content_match:
+                content_html = content_match.group(1)
+            else:
+                content_html = html
+
+        # 清理脚本、样式、导航等非内容元素
+        content_html = _strip_tags(content_html, self._GENERAL_STRIP_TAGS)
+
+        return title, author, content_html
+
+    def _extract_image_urls(self, html, base_url=None):
+        """提取所有图片URL"""
+        urls = []
+        seen = set()
+        # 基础URL的协议和域名只解析一次
+        base_origin = None
+        if base_url:
+            parsed_base = urllib.parse.urlsplit(base_url)
+            base_origin = f"{parsed_base.scheme}://{parsed_base.netloc}"
+
+        # 匹配src属性（优先使用原始src，不提取代理URL中的实际URL）
+        for match in _RE_IMG_SRC.finditer(html):
+            url = match.group(1)
+
+            # 按前缀分派：绝对URL直接使用，/ 开头的按相对URL处理，其余（data: 等）跳过
+            if url.startswith(('http://', 'https://')):
+                pass
+            elif url.startswith('//'):
+                url = 'https:' + url
+            elif url.startswith('/') and base_url:
+                # 对于 Notion 的图片代理URL，构建完整的代理URL
+                if '/_next/image?url=' in url:
+                    url = base_origin + url
+                else:
+                    url = urllib.parse.urljoin(base_url, url)
+            else:
+                continue
+
+            # 解码HTML实体（&amp; -> & 等）；放在前缀判断之后，跳过的data: URL无需解码
+            if '&' in url:
+                url = _unescape_url(url)
+
+            # 用集合去重，保持首次出现的顺序
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+
+    def _html_to_markdown(self, html):
+        """HTML转Markdown"""
+        # 安装lxml时单遍遍历元素树，否则使用逐类标签替换的正则实现
+        if lxml_html is not None:
+            markdown = self._html_to_markdown_lxml(html)
+            if markdown is not None:
+                return markdown
+
+        # 预处理
+        html = _RE_COMMENT.sub('', html)
+
+        # 处理图片 - 同时规范化URL（// 开头的转为 https://）
+        def process_img_tag(match):
+            full_match = match.group(0)
+            # 提取 data-src 或 src
+            src_match = _RE_IMG_TAG_SRC.search(full_match)
+            if not src_match:
+                return ''
+            url = src_match.group(1)
+
+            # 规范化URL
+            if url.startswith('//'):
+                url = 'https:' + url
+
+            # 提取 alt
+            alt_match = _RE_IMG_TAG_ALT.search(full_match)
+            alt = alt_match.group(1) if alt_match else '图片'
+
+            return f'\n\n![{alt}]({url})\n\n'
+
+        html = _RE_IMG_TAG.sub(process_img_tag, html)
+
+        # 处理标题
+        html = _RE_HEADING.sub(lambda m: f'\n\n{"#" * int(m.group(1))} {m.group(2)}\n', html)
+
+        # 处理section
+        html = _RE_SECTION.sub(r'\1', html)
+
+        # 处理段落
+        html = _RE_P.sub(r'\n\n\1\n', html)
+
+        # 处理换行
+        html = _RE_BR.sub(r'  \n', html)
+
+        # 处理粗体
+        html = _RE_STRONG.sub(r'**\2**', html)
+
+        # 处理斜体
+        html = _RE_EM.sub(r'*\2*', html)
+
+        # 处理链接
+        html = _RE_LINK.sub(r'[\2](\1)', html)
+
+        # 处理引用块
+        def process_blockquote(match):
+            lines = (line.strip() for line in match.group(1).strip().split('\n'))
+            return '\n' + ''.join(f'> {line}\n' for line in lines if line) + '\n'
+
+        html = _RE_BLOCKQUOTE.sub(process_blockquote, html)
+
+        # 处理列表 - 有序列表需在无序列表项替换之前处理，否则其中的li已被转换
+        def replace_ol(match):
+            items = _RE_LI.findall(match.group(1))
+            return '\n' + ''.join(f'{i}. {item.strip()}\n' for i, item in enumerate(items, 1))
+
+        html = _RE_OL.sub(replace_ol, html)
+        html = _RE_UL.sub(r'\n\1\n', html)
+        html = _RE_LI.sub(r'- \1\n', html)
+
+        # 处理表格
+        def process_table(match):
+            table_html = match.group(0)
+            rows = _RE_TR.findall(table_html)
+            parts = ['\n']
+            for i, row in enumerate(rows):
+                cells = _RE_TD.findall(row)
+                cell_text = [_RE_TAG.sub('', c).strip() for c in cells]
+                parts.append('| ' + ' | '.join(cell_text) + ' |\n')
+                if i == 0:
+                    parts.append('|' + '|'.join(['---'] * len(cells)) + '|\n')
+            parts.append('\n')
+            return ''.join(parts)
+
+        html = _RE_TABLE.sub(process_table, html)
+
+        # 处理代码块
+        html = _RE_PRE_CODE.sub(r'\n\n```\n\1\n```\n', html)
+        html = _RE_PRE.sub(r'\n\n```\n\1\n```\n', html)
+        html = _RE_CODE.sub(r'`\1`', html)
+
+        # 处理分隔线
+        html = _RE_HR.sub(r'\n\n---\n\n', html)
+
+        # 处理span和div
+        html = _RE_SPAN.sub(r'\1', html)
+        html = _RE_DIV.sub(r'\1', html)
+
+        # 移除剩余HTML标签
+        html = _RE_TAG.sub('', html)
+
+        # 一次解码全部HTML实体
+        return self._tidy_markdown(unescape(html))
+
+    def _tidy_markdown(self, markdown):
+        """清理不可见字符和多余空白"""
+        markdown = markdown.translate(_INVISIBLE_CHARS)
+
+        # 清理多余空白
+        markdown = _RE_BLANK_LINES.sub('\n\n', markdown)
+        lines = markdown.split('\n')
+        markdown = '\n'.join(line.rstrip() for line in lines)
+
+        return markdown.strip()
+
+    def _html_to_markdown_lxml(self, html):
+        """用lxml解析一次HTML，单遍遍历元素树生成Markdown；解析失败时返回None"""
+        try:
+            root = lxml_html.fragment_fromstring(html, create_parent='div')
+        except (etree.ParserError, ValueError):
+            return None
+
+        parts = []
+        self._render_markdown_children(root, parts)
+        # lxml已解码HTML实体，只需清理空白
+        return self._tidy_markdown(''.join(parts))
+
+    def _render_markdown_children(self, node, parts):
+        """依次输出元素的文本、子元素及其尾随文本"""
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            self._render_markdown_element(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def _render_markdown_inner(self, node):
+        """返回元素内部内容对应的Markdown"""
+        parts = []
+        self._render_markdown_children(node, parts)
+        return ''.join(parts)
+
+    def _render_markdown_element(self, el, parts):
+        """按标签输出单个元素的Markdown，与正则实现的转换规则保持一致"""
+        tag = el.tag
+        if not isinstance(tag, str) or tag in ('script', 'style'):
+            # 注释、处理指令以及脚本样式不输出
+            return
+
+        if tag == 'img':
+            url = el.get('data-src') or el.get('src')
+            if not url:
+                return
+            # 规范化URL
+            if url.startswith('//'):
+                url = 'https:' + url
+            parts.append(f'\n\n![{el.get("alt", "图片")}]({url})\n\n')
+        elif tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            parts.append(f'\n\n{"#" * int(tag[1])} {self._render_markdown_inner(el)}\n')
+        elif tag == 'p':
+            parts.append(f'\n\n{self._render_markdown_inner(el)}\n')
+        elif tag == 'br':
+            parts.append('  \n')
+        elif tag in ('strong', 'b'):
+            parts.append(f'**{self._render_markdown_inner(el)}**')
+        elif tag in ('em', 'i'):
+            parts.append(f'*{self._render_markdown_inner(el)}*')
+        elif tag == 'a' and el.get('href') is not None:
+            parts.append(f'[{self._render_markdown_inner(el)}]({el.get("href")})')
+        elif tag == 'blockquote':
+            parts.append('\n')
+            for line in self._render_markdown_inner(el).strip().split('\n'):
+                if line.strip():
+                    parts.append(f'> {line.strip()}\n')
+            parts.append('\n')
+        elif tag == 'ul':
+            parts.append('\n')
+            self._render_markdown_children(el, parts)
+            parts.append('\n')
+        elif tag == 'li':
+            parts.append(f'- {self._render_markdown_inner(el)}\n')
+        elif tag == 'ol':
+            parts.append('\n')
+            items = (child for child in el if child.tag == 'li')
+            for i, item in enumerate(items, 1):
+                parts.append(f'{i}. {self._render_markdown_inner(item).strip()}\n')
+        elif tag == 'table':
+            parts.append('\n')
+            for i, row in enumerate(el.iter('tr')):
+                cells = [cell.text_content().strip() for cell in row if cell.tag in ('td', 'th')]
+                parts.append('| ' + ' | '.join(cells) + ' |\n')
+                if i == 0:
+                    parts.append('|' + '|'.join(['---'] * len(cells)) + '|\n')
+            parts.append('\n')
+        elif tag == 'pre':
+            parts.append(f'\n\n```\n{el.text_content()}\n```\n')
+        elif tag == 'code':
+            parts.append(f'`{self._render_markdown_inner(el)}`')
+        elif tag == 'hr':
+            parts.append('\n\n---\n\n')
+        else:
+            # section、div、span等容器只输出内部内容
+            self._render_markdown_children(el, parts)
+
+    def _generate_markdown(self, url, title, author, content, today):
+        """生成Markdown文件内容"""
+        return f"""# {title}
+
+> **作者**: {author}
+> **原文链接**: {url}
+> **保存日期**: {today}
+
+---
+
+{content}
+"""
+
+    def _generate_styled_html(self, url, title, author, content_html, today):
+        """生成保留样式的HTML文件"""
+
+        html_template = f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>{self._STYLED_CSS}</style>
+</head>
+<body>
+    <div class="article-header">
+        <h1 class="article-title">{title}</h1>
+        <div class="article-meta">
+            <strong>作者:</strong> {author} |
+            <strong>保存日期:</strong> {today} |
+            <a href="{url}" target="_blank">原文链接</a>
+        </div>
+    </div>
+    <div class="article-content">
+{content_html}
+    </div>
+</body>
+</html>"""
+        return html_template
+
+    def _sanitize_filename(self, title):
+        """清理文件名"""
+        filename = title.translate(_FILENAME_INVALID_CHARS)
+        filename = _RE_WHITESPACE.sub('_', filename)
+        if len(filename) > 100:
+            filename = filename[:100]
+        return filename if filename else 'article'
+
+    def replace_image_urls(self, content, url_mapping):
+        """替换图片URL为本地路径（所有URL合并为一个正则，单遍扫描替换）"""
+        return ''.join(self.replace_image_urls_iter(content, url_mapping))
+
+    def replace_image_urls_iter(self, content, url_mapping):
+        """逐段生成替换图片URL后的内容，调用方可边生成边写入，无需再构造一份完整副本"""
+        if not url_mapping:
+            yield content
+            return
+
+        pattern, replacements = _image_url_replacer(tuple(url_mapping.items()))
+        pos = 0
+        for match in pattern.finditer(content):
+            yield content[pos:match.start()]
+            yield replacements[match.group(0)]
+            pos = match.end()
+        yield content[pos:]
+
+    def write_with_local_images(self, filepath, content, url_mapping):
+        """将替换图片URL后的内容分段写入文件"""
+        with open(filepath, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(self.replace_image_urls_iter(content, url_mapping))